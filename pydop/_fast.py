@@ -0,0 +1,228 @@
+
+# This file is part of the pydop library.
+# Copyright (c) 2021 ONERA.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see
+# <http://www.gnu.org/licenses/>.
+#
+
+# Author: Michael Lienhardt
+# Maintainer: Michael Lienhardt
+# email: michael.lienhardt@onera.fr
+
+"""
+This file contains the scalar kernels called in the tight inner loops of the library
+ (currently, the interval and domain membership tests).
+They are written so that they can be compiled with numba:
+ when numba is importable (and the PYDOP_NO_JIT environment variable is not set),
+ they are replaced by their jitted version, with on-disk caching to amortize the compilation cost;
+ otherwise the pure Python definitions below are used.
+"""
+
+import os
+
+
+def _interval_contains__(v_min, v_max, value):
+  """_interval_contains__(number, number, number) -> bool
+Returns if `value` is within the right-open interval [v_min, v_max[
+  """
+  return ((v_min <= value) and (value < v_max))
+
+
+def _domain_contains__(v_mins, v_maxs, value):
+  """_domain_contains__(tuple[float], tuple[float], number) -> bool
+Returns if `value` is within one of the right-open intervals [v_mins[i], v_maxs[i][
+  """
+  for i in range(len(v_mins)):
+    if((v_mins[i] <= value) and (value < v_maxs[i])):
+      return True
+  return False
+
+
+##########################################
+# close-configuration sweep kernel
+
+# The kernel works on a flat array encoding of a feature tree
+#  (see fm_diagram._fd__c._close_plan__): one entry per feature, parents before children.
+# The feature kinds (FDAny and FDOr share their inference rule):
+_fd_kind_and__   = 0
+_fd_kind_group__ = 1  # FDAny / FDOr
+_fd_kind_xor__   = 2
+# The tri-state encoding of the selected value of a feature
+#  (i.e., of its entry in the is_true_d dict of fm_diagram.close_configuration):
+_sv_false__ = 0
+_sv_true__  = 1
+_sv_empty__ = 2  # the feature has no entry
+
+
+def _fm_close_visit__(kinds, child_beg, child_end, children, vals, idxs, stamps, i, t):
+  """_fm_close_visit__(arrays..., int, int) -> None
+One close-configuration visit of feature `i` at time `t`,
+ mirroring its `_infer_sv__` + `_make_product_update__` pair of fm_diagram.
+Every entry actually modified is stamped with `t`,
+ so that later visits reading an unchanged neighborhood can be skipped.
+  """
+  kind = kinds[i]
+  beg = child_beg[i]
+  end = child_end[i]
+  if(kind == _fd_kind_and__):
+    # the max-priority entry of self and its children gives the witness value,
+    #  which overrides every entry of lower priority
+    best = -1
+    wv = _sv_empty__
+    if(vals[i] != _sv_empty__):
+      best = idxs[i]
+      wv = vals[i]
+    for p in range(beg, end):
+      c = children[p]
+      if((vals[c] != _sv_empty__) and (idxs[c] > best)):
+        best = idxs[c]
+        wv = vals[c]
+    if(((vals[i] == _sv_empty__) or (idxs[i] < best)) and (wv != _sv_empty__)):
+      vals[i] = wv
+      idxs[i] = best
+      stamps[i] = t
+    for p in range(beg, end):
+      c = children[p]
+      if(((vals[c] == _sv_empty__) or (idxs[c] < best)) and (wv != _sv_empty__)):
+        vals[c] = wv
+        idxs[c] = best
+        stamps[c] = t
+  else:
+    # FDAny/FDOr/FDXor: a True child of higher priority selects the group
+    best = -1
+    for p in range(beg, end):
+      c = children[p]
+      if((vals[c] == _sv_true__) and (idxs[c] > best)):
+        best = idxs[c]
+    if(vals[i] != _sv_empty__):
+      vl = vals[i]
+      il = idxs[i]
+    else:
+      vl = _sv_false__
+      il = -1
+    if(best > il):
+      il = best
+      vl = _sv_true__
+    if((vals[i] != vl) or (idxs[i] != il)):
+      vals[i] = vl
+      idxs[i] = il
+      stamps[i] = t
+    if((kind == _fd_kind_xor__) and (best > -1)):
+      # exactly-one normalization: only the max-priority True children stay True
+      for p in range(beg, end):
+        c = children[p]
+        if((vals[c] == _sv_true__) and (idxs[c] == best)):
+          nv = _sv_true__
+        else:
+          nv = _sv_false__
+        if((vals[c] != nv) or (idxs[c] != il)):
+          vals[c] = nv
+          idxs[c] = il
+          stamps[c] = t
+    else:
+      for p in range(beg, end):
+        c = children[p]
+        if((vals[c] != _sv_empty__) and (idxs[c] != il)):
+          idxs[c] = il
+          stamps[c] = t
+
+
+def _fm_close_sweeps__(kinds, child_beg, child_end, children, vals, idxs, stamps):
+  """_fm_close_sweeps__(array[int] x7) -> None
+Runs the two close-configuration sweeps over a flat feature tree
+ (forward: every feature before its children; backward: the reverse),
+ updating the selected values `vals` and their priorities `idxs` in place.
+The forward visit of feature `i` happens at time `i` and stamps its changes;
+ its backward visit only reads `i` and its children and is idempotent,
+ so it is skipped unless one of those entries was changed after time `i`.
+  """
+  n = len(kinds)
+  for i in range(n):
+    _fm_close_visit__(kinds, child_beg, child_end, children, vals, idxs, stamps, i, i)
+  for k in range(n, 2 * n):
+    i = (2 * n) - 1 - k
+    redo = (stamps[i] > i)
+    if(not redo):
+      for p in range(child_beg[i], child_end[i]):
+        if(stamps[children[p]] > i):
+          redo = True
+          break
+    if(redo):
+      _fm_close_visit__(kinds, child_beg, child_end, children, vals, idxs, stamps, i, k)
+
+
+def _fm_close_decide__(kinds, child_beg, child_end, children, vals, idxs, decided):
+  """_fm_close_decide__(array[int] x7) -> None
+Computes the decided boolean value of every feature from the final sweep state,
+ filling `decided` top-down (the caller seeds the root, parents are written before their children).
+Every per-kind branch mirrors the v_subs part of the corresponding `_infer_sv__`,
+ read-only on `vals`/`idxs`: this replaces one inference per feature in the second
+ close-configuration pass.
+  """
+  n = len(kinds)
+  for i in range(n):
+    kind = kinds[i]
+    beg = child_beg[i]
+    end = child_end[i]
+    if(kind == _fd_kind_and__):
+      best = -1
+      wv = _sv_empty__
+      if(vals[i] != _sv_empty__):
+        best = idxs[i]
+        wv = vals[i]
+      for p in range(beg, end):
+        c = children[p]
+        if((vals[c] != _sv_empty__) and (idxs[c] > best)):
+          best = idxs[c]
+          wv = vals[c]
+      for p in range(beg, end):
+        c = children[p]
+        if((vals[c] == _sv_empty__) or (idxs[c] < best)):
+          v = wv
+        else:
+          v = vals[c]
+        decided[c] = (1 if(v == _sv_true__) else 0)
+    elif(kind == _fd_kind_xor__):
+      best = -1
+      for p in range(beg, end):
+        c = children[p]
+        if((vals[c] == _sv_true__) and (idxs[c] > best)):
+          best = idxs[c]
+      if(best > -1):
+        for p in range(beg, end):
+          c = children[p]
+          decided[c] = (1 if((vals[c] == _sv_true__) and (idxs[c] == best)) else 0)
+      else:
+        for p in range(beg, end):
+          c = children[p]
+          decided[c] = (1 if(vals[c] == _sv_true__) else 0)
+    else: # FDAny / FDOr
+      for p in range(beg, end):
+        c = children[p]
+        decided[c] = (1 if(vals[c] == _sv_true__) else 0)
+
+
+_jit_enabled__ = False
+
+if(not os.environ.get("PYDOP_NO_JIT")):
+  try:
+    from numba import njit
+    _interval_contains__ = njit(cache=True)(_interval_contains__)
+    _domain_contains__   = njit(cache=True)(_domain_contains__)
+    _fm_close_visit__    = njit(cache=True)(_fm_close_visit__)
+    _fm_close_sweeps__   = njit(cache=True)(_fm_close_sweeps__)
+    _fm_close_decide__   = njit(cache=True)(_fm_close_decide__)
+    _jit_enabled__ = True
+  except ImportError:
+    pass
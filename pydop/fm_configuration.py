@@ -76,7 +76,7 @@ Parameters:
     global _empty__
     res = self.m_dict.get(key, _empty__)
     if(res is _empty__):
-      if(isinstance(key, str) and (self.m_resolver is not None)):
+      if((type(key) is str) and (self.m_resolver is not None)):
         key_resolved = self.m_resolver(key, errors, None)
         if(key_resolved is not None):
           return self.m_dict.get(key_resolved, default)
@@ -117,8 +117,9 @@ Raises KeyError if a name in `self` is not known by the resolver
       errors = decl_errors__c()
       d_new = {}
       names = {}
+      resolve = resolver.resolve # bound once: this loop runs for every key of every linked product
       for key, val in d.items():
-        key_resolved = resolver.resolve(key, d, errors, None)
+        key_resolved = resolve(key, d, errors, None)
         if(key_resolved is not None):
           names[key_resolved] = key
           d_new[key_resolved] = val
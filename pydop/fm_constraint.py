@@ -26,7 +26,9 @@ In particular, the class `_expbool__c` is an abstract super classes of all boole
 """
 
 import itertools
+import weakref
 
+from pydop import fm_result
 from pydop.fm_result import decl_errors__c, reason_tree__c, eval_result__c
 from pydop.fm_configuration import configuration__c
 from pydop.utils import _empty__, lookup_wrapper__c
@@ -36,18 +38,30 @@ from pydop.utils import anot
 # Boolean constraints
 ################################################################################
 
+# Flyweight cache for the Var leaves created from plain variable names:
+#  constraints mentioning the same variable share one Var instance per name
+#  (Var objects are immutable: linking creates new instances and does not mutate them).
+_var_cache__ = weakref.WeakValueDictionary()
+
+
 ##########################################
 # 1. main class (for all non leaf behavior)
 
 class _expbool__c(object):
   """Core abstract class containing most functionalities of boolean expressions"""
-  __slots__ = ("m_content", "m_vars",)
+  __slots__ = ("m_content", "m_vars", "m_compiled", "m_accessors", "__weakref__",)
+  # maps the expected value of a node to the expected value of its children:
+  #  it only depends on the operator class, so it is looked up once per node evaluation
+  #  instead of calling a virtual method once per child (overridden by And, Or and Not)
+  _expected_map__ = {True: None, False: None, None: None}
   def __init__(self, content):
     """_expbool__c(iterable) -> _expbool__c
 Generic constructor that stores a tuple of the boolean-version of the elements in the parameter
     """
     self.m_content = tuple(_expbool__c._manage_parameter__(param) for param in content)
     self.m_vars = None
+    self.m_compiled = None
+    self.m_accessors = None
 
   def get_name(self):
     """get_name() -> str
@@ -58,35 +72,169 @@ Return the name of the boolean (i.e., the name of `self`'s class)
 
   ## constraint API
 
-  def __call__(self, product, idx=None, expected=True):
+  def __call__(self, product, idx=None, expected=True, cache=None):
     """self(dict/configuration) -> eval_result__c
 self(dict/configuration, , bool) -> eval_result__c
-Evaluates the value of the boolean expression w.r.t. the product in parameter
+Evaluates the value of the boolean expression w.r.t. the product in parameter.
+`cache` memoizes the evaluation of shared subexpressions for the duration of one top-level call
+ (the product is fixed during that call, so reason-free results can be reused as is)
     """
     # print(f"{self.__class__.__name__}.__call__({product}, {idx}, {expected})")
-    # results = tuple(_expbool__c._eval_generic__(el, product, i, self._get_expected__(el, i, expected)) for i, el in enumerate(self.m_content))
-    results = tuple(el(product, i, self._get_expected__(el, i, expected)) for i, el in enumerate(self.m_content))
+    if(cache is None): cache = {}
+    key = (id(self), expected)
+    res = cache.get(key)
+    if(res is not None): return res
+    sub_expected = self._expected_map__[expected]
+    results = tuple(a(product, i, sub_expected, cache) for i, a in enumerate(self._get_accessors__()))
     values = tuple(el.value() for el in results)
     res = self._compute__(values)
-    if(res == expected):
+    if((res == expected) or (not fm_result._collect_reasons__)):
       reason = None
     else:
       reason = reason_tree__c(self.get_name(), idx)
       for i, el in enumerate(self.m_content):
-        reason.add_reason_value_mismatch(el, results[i], self._get_expected__(el, i, expected))
+        reason.add_reason_value_mismatch(el, results[i], sub_expected)
       for r in results:
         reason.add_reason_sub(r)
-    return eval_result__c(res, reason)
- 
+    res = eval_result__c(res, reason)
+    # only reason-free results are position independent
+    #  (and reason trees are mutated by update_ref, so they must not be shared)
+    if(reason is None): cache[key] = res
+    return res
+
+  def explain(self, product, idx=None, expected=True):
+    """explain(dict/configuration) -> eval_result__c
+Like `__call__`, but forces the construction of the reason tree,
+ even when reason collection has been disabled with `fm_result._set_collect_reasons__`
+    """
+    prev = fm_result._set_collect_reasons__(True)
+    try:
+      return self(product, idx, expected)
+    finally:
+      fm_result._set_collect_reasons__(prev)
+
+  def compile(self):
+    """compile() -> function
+Compiles this boolean expression into a single Python function mapping a product to the expression's truth-value,
+ replacing the per-node `__call__` dispatch by one byte-compiled expression.
+The compiled function does not build any reason tree
+ (it is the fast path for workflows that only need the boolean, e.g., delta activation or product searches);
+ it is generated on first call and cached.
+    """
+    res = getattr(self, "m_compiled", None)
+    if(res is None):
+      env = {"_empty__": _empty__}
+      src = self._compile_expr__(env)
+      exec(f"def _compiled__(product):\n  return {src}", env)
+      res = env["_compiled__"]
+      self.m_compiled = res
+    return res
+
+  def _compile_expr__(self, env):
+    """_compile_expr__(dict) -> str
+Returns the Python expression computing the truth-value of this node
+ (the objects referenced by the expression are named and stored in `env`)
+    """
+    raise NotImplementedError()
+
+  def _compile_sub__(self, env):
+    return tuple(el._compile_expr__(env) for el in self.m_content)
+
+  def _compile_binary__(self, env, op):
+    left, right = self._compile_sub__(env)
+    return f"(({left}) {op} ({right}))"
+
+  def _eval_shortcut__(self, product, idx, expected, stop_on, cache=None):
+    """_eval_shortcut__(dict/configuration, int, bool, bool) -> eval_result__c
+Short-circuiting variant of `__call__` for `And` (`stop_on` is False) and `Or` (`stop_on` is True):
+ evaluation stops at the first sub-expression whose truth-value determines the result,
+ and the reason tree (when the result is not the expected one) only covers the evaluated sub-expressions
+    """
+    if(cache is None): cache = {}
+    key = (id(self), expected)
+    res = cache.get(key)
+    if(res is not None): return res
+    sub_expected = self._expected_map__[expected]
+    results = []
+    res = (not stop_on)
+    for i, a in enumerate(self._get_accessors__()):
+      r = a(product, i, sub_expected, cache)
+      results.append(r)
+      if(bool(r.value()) == stop_on):
+        res = stop_on
+        break
+    if((res == expected) or (not fm_result._collect_reasons__)):
+      reason = None
+    else:
+      reason = reason_tree__c(self.get_name(), idx)
+      for i, r in enumerate(results):
+        reason.add_reason_value_mismatch(self.m_content[i], r, sub_expected)
+      for r in results:
+        reason.add_reason_sub(r)
+    res = eval_result__c(res, reason)
+    if(reason is None): cache[key] = res
+    return res
+
+  def _get_accessors__(self):
+    """_get_accessors__() -> tuple[function]
+Returns one evaluation function per sub-expression (same signature as `__call__`),
+ specialized at first use: leaves are inlined into monomorphic closures,
+ so the evaluation loops do not pay a class dispatch per child per call
+    """
+    res = self.m_accessors
+    if(res is None):
+      res = tuple(el._make_accessor__() for el in self.m_content)
+      self.m_accessors = res
+    return res
+
+  def _make_accessor__(self):
+    return self
+
+  def _selectivity__(self):
+    """_selectivity__() -> float
+Crude estimate of the probability that this expression evaluates to True,
+ used to schedule the children of `And` and `Or` for fail-fast short-circuit evaluation
+    """
+    return 0.5
+
   @staticmethod
   def _manage_parameter__(param):
     if(isinstance(param, _expbool__c)):
       return param
     elif(isinstance(param, str)):
-      return Var(param)
+      res = _var_cache__.get(param)
+      if(res is None):
+        res = Var(param)
+        _var_cache__[param] = res
+      return res
     else:
       return Lit(param)
 
+  @staticmethod
+  def _flatten_content__(cls, content, neutral, absorbing):
+    """_flatten_content__(class, tuple[_expbool__c], bool, bool) -> tuple[_expbool__c]
+Algebraic simplification of the content of an associative operator (`And` or `Or`):
+ nested `cls` sub-expressions are inlined, literal neutral elements are dropped,
+ a literal absorbing element collapses the whole content, and duplicated sub-expressions are kept once
+    """
+    res = []
+    seen = set()
+    for el in content:
+      for sub in (el.m_content if(isinstance(el, cls)) else (el,)):
+        if(isinstance(sub, Lit)):
+          if(sub.m_content is neutral): continue
+          if(sub.m_content is absorbing): return (sub,)
+        try:
+          key = (sub.__class__, sub.m_content) if(isinstance(sub, (Var, Lit))) else id(sub)
+          is_dup = (key in seen)
+        except TypeError: # unhashable literal content: cannot be deduplicated
+          is_dup = False
+          key = None
+        if(is_dup): continue
+        if(key is not None): seen.add(key)
+        res.append(sub)
+    return tuple(res)
+
   def link(self, location, resolver, errors):
     res = _expbool__c(tuple(map((lambda sub: sub.link(location, resolver, errors)), self.m_content)))
     res.__class__ = self.__class__
@@ -168,14 +316,13 @@ class Var(_expbool__c):
 The parameter is the id of the variable
     """
     self.m_content = var
-  def __call__(self, product, idx=None, expected=True):
+  def __call__(self, product, idx=None, expected=True, cache=None):
     global _empty__
     res = product.get(self.m_content, _empty__)
-    if(res is _empty__):
+    reason = None
+    if((res is _empty__) and fm_result._collect_reasons__):
       reason = reason_tree__c(self.get_name(), idx)
       reason.add_reason_value_none(self.m_content)
-    else:
-      reason = None
     return eval_result__c(res, reason)
   def __str__(self): return f"Var({self.m_content})"
 
@@ -186,6 +333,23 @@ The parameter is the id of the variable
   def _vars_update(self, s):
     s.add(self.m_content)
 
+  def _make_accessor__(self):
+    var = self.m_content
+    name = self.get_name()
+    def accessor(product, idx, expected, cache):
+      res = product.get(var, _empty__)
+      reason = None
+      if((res is _empty__) and fm_result._collect_reasons__):
+        reason = reason_tree__c(name, idx)
+        reason.add_reason_value_none(var)
+      return eval_result__c(res, reason)
+    return accessor
+
+  def _compile_expr__(self, env):
+    name = f"_x{len(env)}"
+    env[name] = self.m_content
+    return f"product.get({name}, _empty__)"
+
   def add_to_dimacs(self, dimacs_obj):
     return dimacs_obj.get(self.m_content)
 
@@ -199,7 +363,7 @@ class Lit(_expbool__c):
 The parameter is the wrapped object
     """
     self.m_content = var
-  def __call__(self, product, idx=None, expected=True):
+  def __call__(self, product, idx=None, expected=True, cache=None):
     return eval_result__c(self.m_content, None)
   def __str__(self): return f"Lit({self.m_content})"
 
@@ -208,6 +372,18 @@ The parameter is the wrapped object
 
   def _vars_update(self, s): pass
 
+  def _make_accessor__(self):
+    res = eval_result__c(self.m_content, None)  # constant: one result object for all calls
+    return (lambda product, idx, expected, cache: res)
+
+  def _selectivity__(self):
+    return (1.0 if(self.m_content) else 0.0)
+
+  def _compile_expr__(self, env):
+    name = f"_x{len(env)}"
+    env[name] = self.m_content
+    return name
+
 ##########################################
 # 3. constraint over non-booleans
 
@@ -218,7 +394,7 @@ class Lt(_expbool__c):
     _expbool__c.__init__(self, (left, right,))
   def _compute__(self, values):
     return (values[0] < values[1])
-  def _get_expected__(self, el, idx, expected): return None
+  def _compile_expr__(self, env): return self._compile_binary__(env, "<")
       
 class Leq(_expbool__c):
   """Class for the <= comparison"""
@@ -227,7 +403,7 @@ class Leq(_expbool__c):
     _expbool__c.__init__(self, (left, right,))
   def _compute__(self, values):
     return (values[0] <= values[1])
-  def _get_expected__(self, el, idx, expected): return None
+  def _compile_expr__(self, env): return self._compile_binary__(env, "<=")
 
 class Eq(_expbool__c):
   """Class for the == comparison"""
@@ -236,7 +412,7 @@ class Eq(_expbool__c):
     _expbool__c.__init__(self, (left, right,))
   def _compute__(self, values):
     return (values[0] == values[1])
-  def _get_expected__(self, el, idx, expected): return None
+  def _compile_expr__(self, env): return self._compile_binary__(env, "==")
 
 class Geq(_expbool__c):
   """Class for the >= comparison"""
@@ -245,7 +421,7 @@ class Geq(_expbool__c):
     _expbool__c.__init__(self, (left, right,))
   def _compute__(self, values):
     return (values[0] >= values[1])
-  def _get_expected__(self, el, idx, expected): return None
+  def _compile_expr__(self, env): return self._compile_binary__(env, ">=")
 
 class Gt(_expbool__c):
   """Class for the > comparison"""
@@ -255,7 +431,7 @@ class Gt(_expbool__c):
   def _compute__(self, values):
     # print(f"Gt._compute__({values})")
     return (values[0] > values[1])
-  def _get_expected__(self, el, idx, expected): return None
+  def _compile_expr__(self, env): return self._compile_binary__(env, ">")
 
 ##########################################
 # 4. boolean operators
@@ -265,11 +441,26 @@ class And(_expbool__c):
   __slots__ = ()
   def __init__(self, *args):
     _expbool__c.__init__(self, args)
+    self.m_content = _expbool__c._flatten_content__(And, self.m_content, True, False)
+    # fail-fast schedule: the children most likely to be False are evaluated first (stable sort)
+    self.m_content = tuple(sorted(self.m_content, key=_expbool__c._selectivity__))
+  def __call__(self, product, idx=None, expected=True, cache=None):
+    """self(dict/configuration) -> eval_result__c
+Evaluates the conjunction, stopping at the first False sub-expression
+ (full evaluation is kept when `expected` is None, since all sub-results are then reported)
+    """
+    if(expected is None):
+      return _expbool__c.__call__(self, product, idx, expected, cache)
+    return self._eval_shortcut__(product, idx, expected, False, cache)
   def _compute__(self, values):
     return all(values)
-  def _get_expected__(self, el, idx, expected):
-    if(expected is True): return True
-    else: return None
+  def _selectivity__(self):
+    return min((el._selectivity__() for el in self.m_content), default=1.0)
+  _expected_map__ = {True: True, False: None, None: None}
+  def _compile_expr__(self, env):
+    subs = self._compile_sub__(env)
+    if(len(subs) == 0): return "True"
+    return "bool(" + " and ".join(f"({s})" for s in subs) + ")"
   def add_to_dimacs(self, dimacs_obj):
     nb_false, nb_true, content_list = self._to_dimacs_content_(dimacs_obj)
     if(nb_false != 0): return False
@@ -294,11 +485,26 @@ class Or(_expbool__c):
   __slots__ = ()
   def __init__(self, *args):
     _expbool__c.__init__(self, args)
+    self.m_content = _expbool__c._flatten_content__(Or, self.m_content, False, True)
+    # fail-fast schedule: the children most likely to be True are evaluated first (stable sort)
+    self.m_content = tuple(sorted(self.m_content, key=_expbool__c._selectivity__, reverse=True))
+  def __call__(self, product, idx=None, expected=True, cache=None):
+    """self(dict/configuration) -> eval_result__c
+Evaluates the disjunction, stopping at the first True sub-expression
+ (full evaluation is kept when `expected` is None, since all sub-results are then reported)
+    """
+    if(expected is None):
+      return _expbool__c.__call__(self, product, idx, expected, cache)
+    return self._eval_shortcut__(product, idx, expected, True, cache)
   def _compute__(self, values):
     return any(values)
-  def _get_expected__(self, el, idx, expected):
-    if(expected is not False): return None
-    else: return False
+  def _selectivity__(self):
+    return max((el._selectivity__() for el in self.m_content), default=0.0)
+  _expected_map__ = {True: None, False: False, None: None}
+  def _compile_expr__(self, env):
+    subs = self._compile_sub__(env)
+    if(len(subs) == 0): return "False"
+    return "bool(" + " or ".join(f"({s})" for s in subs) + ")"
   def add_to_dimacs(self, dimacs_obj):
     nb_false, nb_true, content_list = self._to_dimacs_content_(dimacs_obj)
     if(nb_true != 0): return True
@@ -321,10 +527,11 @@ class Not(_expbool__c):
     _expbool__c.__init__(self, (arg,))
   def _compute__(self, values):
     return not values[0]
-  def _get_expected__(self, el, idx, expected):
-    if(expected is True): return False
-    elif(expected is False): return True
-    else: return None
+  _expected_map__ = {True: False, False: True, None: None}
+  def _selectivity__(self):
+    return (1.0 - self.m_content[0]._selectivity__())
+  def _compile_expr__(self, env):
+    return f"(not ({self.m_content[0]._compile_expr__(env)}))"
   def add_to_dimacs(self, dimacs_obj):
     res = self.m_content[0].add_to_dimacs(dimacs_obj)
     return anot (res)
@@ -335,14 +542,12 @@ class Xor(_expbool__c):
   def __init__(self, *args):
     _expbool__c.__init__(self, args)
   def _compute__(self, values):
-    res = False
-    for element in values:
-      if(element):
-        if(res): return False
-        else: res = True
-    return res
-  def _get_expected__(self, el, idx, expected):
-    return None
+    # single C-level reduction instead of a Python branch per element
+    return (sum(map(bool, values)) == 1)
+  def _compile_expr__(self, env):
+    subs = self._compile_sub__(env)
+    if(len(subs) == 0): return "False"
+    return f"(sum(1 for _v in ({', '.join(subs)},) if _v) == 1)"
   def add_to_dimacs(self, dimacs_obj):
     nb_false, nb_true, content_list = self._to_dimacs_content_(dimacs_obj)
     if(nb_true == 0):
@@ -370,14 +575,12 @@ class Conflict(_expbool__c):
   def __init__(self, *args):
     _expbool__c.__init__(self, args)
   def _compute__(self, values):
-    res = False
-    for element in values:
-      if(element):
-        if(res): return False
-        else: res = True
-    return True
-  def _get_expected__(self, el, idx, expected):
-    return None
+    # single C-level reduction instead of a Python branch per element
+    return (sum(map(bool, values)) <= 1)
+  def _compile_expr__(self, env):
+    subs = self._compile_sub__(env)
+    if(len(subs) == 0): return "True"
+    return f"(sum(1 for _v in ({', '.join(subs)},) if _v) <= 1)"
   def add_to_dimacs(self, dimacs_obj):
     nb_false, nb_true, content_list = self._to_dimacs_content_(dimacs_obj)
     if(nb_true == 0):
@@ -402,8 +605,9 @@ class Implies(_expbool__c):
     _expbool__c.__init__(self, (left, right,))
   def _compute__(self, values):
     return ((not values[0]) or values[1])
-  def _get_expected__(self, el, idx, expected):
-    return None
+  def _compile_expr__(self, env):
+    left, right = self._compile_sub__(env)
+    return f"bool((not ({left})) or ({right}))"
   def add_to_dimacs(self, dimacs_obj):
     vleft  = self.m_content[0].add_to_dimacs(dimacs_obj)
     vright = self.m_content[1].add_to_dimacs(dimacs_obj)
@@ -424,8 +628,7 @@ class Iff(_expbool__c):
     _expbool__c.__init__(self, (left, right,))
   def _compute__(self, values):
     return (values[0] == values[1])
-  def _get_expected__(self, el, idx, expected):
-    return None
+  def _compile_expr__(self, env): return self._compile_binary__(env, "==")
   def add_to_dimacs(self, dimacs_obj):
     vleft  = self.m_content[0].add_to_dimacs(dimacs_obj)
     vright = self.m_content[1].add_to_dimacs(dimacs_obj)
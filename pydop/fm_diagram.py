@@ -24,12 +24,19 @@ import itertools
 import enum
 import inspect
 
+from pydop import fm_result
 from pydop.fm_result import decl_errors__c, reason_tree__c, eval_result__c
 from pydop.fm_constraint import _expbool__c, Var, Lit
 from pydop.fm_configuration import configuration__c
 
 from pydop.utils import _empty__, path__c, lookup__c, domain__c
 from pydop.utils import dimacs__c, anot
+from pydop import _fast
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
 
 
 ################################################################################
@@ -61,7 +68,12 @@ Parameters:
 
 class _fdattribute_c(object):
   """This is the super class of all attribute specification"""
-  pass
+  def check_array(self, values):
+    """check_array(sequence) -> sequence[bool]
+Batched version of `__call__`, checking many candidate values at once (e.g., for configuration sweeps).
+Subclasses with a vectorizable domain override this with a numpy-based implementation.
+    """
+    return [self(value) for value in values]
 
 class Class(_fdattribute_c):
   """This specification enforce that the attribute must be of a specific class"""
@@ -107,6 +119,12 @@ class Int(Class):
       return self.m_domain.contains(value)
     else:
       return False
+  def check_array(self, values):
+    """check_array(sequence[number]) -> sequence[bool]
+Batched version of `__call__` over a numeric array: only the domain is tested, not the Python class
+ (numpy integers are not instances of `int`)
+    """
+    return self.m_domain.check_array(values)
   def __str__(self):
     return "int ∈ " + str(self.m_domain)
 
@@ -121,6 +139,12 @@ class Float(Class):
       return self.m_domain.contains(value)
     else:
       return False
+  def check_array(self, values):
+    """check_array(sequence[number]) -> sequence[bool]
+Batched version of `__call__` over a numeric array: only the domain is tested, not the Python class
+ (numpy floats are not instances of `float`)
+    """
+    return self.m_domain.check_array(values)
   def __str__(self):
     return "float ∈ " + str(self.m_domain)
 
@@ -165,7 +189,15 @@ class _fd__c(object):
     "m_dom",      # mapping {feature_obj -> path}: lists all the features/attributes in the current, and give their path (in string format)
     # the following field is only used at the root feature of a FD during its evaluation
     "m_errors",   # a reason_tree__c object listing all the errors encountered during the evaluation of the FD
+    "m_lookup_cache", # tuple (struct key, m_lookup, m_dom, m_errors): the last generated lookup data, reusable while the tree structure is unchanged
+    "m_eval_plan",    # flat post-order list of evaluation steps, used by evaluate_batch (built lazily, reset by clean())
+    "m_all_nodes",    # flat pre-order tuple of all the features of the tree, used by close_configuration (built lazily, reset by clean())
+    "m_close_plan",   # flat array encoding of the tree for the _fast close-configuration kernel (built lazily, reset by clean())
+    "m_close_cache",  # mapping {input content: closed configuration}: memoizes close_configuration (built lazily, reset by clean())
   )
+  # the main attributes get C-struct slot storage (faster access, less memory per node);
+  #  __dict__ is kept so that the user-defined tags can still be set freely
+  __slots__ = __slots_main__ + ("__dict__",)
 
   ##########################################
   # constructor API
@@ -212,7 +244,10 @@ Parameters:
         children.append(el)
       else:
         ctcs.append(el)
-    return name, children, ctcs, attributes, kwargs
+    # children and ctcs are stored as tuples: they are never mutated in place
+    #  (linking replaces the ctcs wholesale), and the evaluation hot loop iterates
+    #  them on every call, where tuples are the cheapest sequence to walk
+    return name, tuple(children), tuple(ctcs), attributes, kwargs
 
   @staticmethod
   def _manage_parameter__(param):
@@ -243,14 +278,48 @@ Returns if the feature is a leaf (i.e., has no sub-trees)
     """
     return len(self.children) == 0
 
+  def __str__(self):
+    # used only on error/debug paths (evaluation stringifies its reasons lazily):
+    #  named features print their name, anonymous ones keep the default repr
+    return (object.__repr__(self) if(self.name is None) else self.name)
+  __repr__ = __str__
+
   ##########################################
   # generate_lookup API
 
   def clean(self):
-    """Remove automatically generated data"""
+    """Remove automatically generated data (kept aside, for reuse if the tree structure did not change)"""
+    # m_lookup_cache is left untouched: it was stored by generate_lookup with a key
+    #  computed at generation time, which is the only pairing that detects a mutation
+    #  happening between the generation and this clean
     self.m_lookup = None
     self.m_dom    = None
     self.m_errors = None
+    self.m_eval_plan = None
+    self.m_all_nodes = None
+    self.m_close_plan = None
+    self.m_close_cache = None
+
+  def _struct_key__(self):
+    """_struct_key__() -> tuple
+Tuple identifying the structure of this feature subtree (node identities, names, attributes and cross-tree constraints).
+Two calls return equal tuples iff no feature/attribute/constraint was added, removed or replaced in between
+ (the tuples are compared directly rather than hashed, so a hash collision cannot validate a stale lookup).
+The key is a flat pre-order encoding (one entry per feature, with its child count) rather than a nested tuple:
+ both building and comparing it are then iterative, so deep generated diagrams do not hit the recursion limit.
+    """
+    key = []
+    stack = [self]
+    while(stack):
+      node = stack.pop()
+      key.append((
+        id(node), node.name, len(node.children),
+        tuple(id(att_def) for att_def in node.attributes),
+        tuple(id(ctc) for ctc in node.ctcs),
+      ))
+      for sub in reversed(node.children):
+        stack.append(sub)
+    return tuple(key)
 
   def check(self):
     """check() -> decl_errors__c
@@ -264,10 +333,16 @@ Checks if the feature tree is well defined (i.e., all used features are defined
 Computes the lookup mapping (i.e., the mapping partial path -> feature) for this feature tree, and returns the possibly non-empty list of declaration errors in this tree.
     """
     if(self.m_lookup is None):
-      self.m_errors = decl_errors__c()
-      self.m_lookup = lookup__c()
-      self.m_dom    = {}
-      self._generate_lookup_rec__([], 0, self.m_lookup, self.m_dom, self.m_errors)
+      cache = getattr(self, "m_lookup_cache", None)
+      if((cache is not None) and (cache[0] == self._struct_key__())):
+        _, self.m_lookup, self.m_dom, self.m_errors = cache
+      else:
+        self.m_errors = decl_errors__c()
+        self.m_lookup = lookup__c()
+        self.m_dom    = {}
+        self._generate_lookup__(self.m_lookup, self.m_dom, self.m_errors)
+        # the key is computed after the generation, since linking replaces the ctcs
+        self.m_lookup_cache = (self._struct_key__(), self.m_lookup, self.m_dom, self.m_errors)
     return self.m_errors
 
   def link_constraint(self, c):
@@ -285,6 +360,24 @@ Computes the lookup mapping (i.e., the mapping partial path -> feature) for this
 
   def close_configuration(self, *confs):
     self._check_lookup_("close a configuration")
+    # memoization by input content: product-building chains close the same
+    #  configurations over and over (only error-free closures of hashable plain
+    #  dicts are cached; the cache is reset by clean() with the other generated data)
+    cache = self.m_close_cache
+    if(cache is None):
+      cache = {}
+      self.m_close_cache = cache
+    key = None
+    if(all((type(conf) is dict) for conf in confs)):
+      try:
+        key = tuple(frozenset(conf.items()) for conf in confs)
+      except TypeError: # unhashable value: not cacheable
+        key = None
+    if(key is not None):
+      cached = cache.pop(key, None)
+      if(cached is not None):
+        cache[key] = cached # reinsertion keeps the eviction order least-recently-used
+        return (cached, decl_errors__c())
     errors = decl_errors__c()
     is_true_d = {}
     names = {}
@@ -294,16 +387,17 @@ Computes the lookup mapping (i.e., the mapping partial path -> feature) for this
       for k, v in conf_dict.items():
         is_true_d[k] = (v, i)
         names[k] = conf.m_names.get(k, k)
-    self._close_configuration_1__(is_true_d)
-    # print("=====================================")
-    # print("is_true_d")
-    # print(is_true_d)
-    # print("=====================================")
+    sv = self._close_configuration_1__(is_true_d)
     res = {}
     v_local = is_true_d.get(self, _empty__)
-    if(v_local is _empty__): self._close_configuration_2__(False, is_true_d, res)
-    else: self._close_configuration_2__(v_local[0], is_true_d, res)
-    return (configuration__c(res, self.m_lookup.resolve, names), errors)
+    if(v_local is _empty__): self._close_configuration_2__(False, is_true_d, res, sv)
+    else: self._close_configuration_2__(v_local[0], is_true_d, res, sv)
+    res = configuration__c(res, self.m_lookup.resolve, names)
+    if((key is not None) and (not errors)):
+      if(len(cache) >= 256): # bounded: drop the least recently used entry
+        del cache[next(iter(cache))]
+      cache[key] = res
+    return (res, errors)
 
   def _check_lookup_(self, op):
     # 1. check if the lookup was computed
@@ -318,47 +412,138 @@ Computes the lookup mapping (i.e., the mapping partial path -> feature) for this
 
   def __call__(self, conf, expected=True):
     self._check_lookup_("be called")
-    res = self._eval_generic__(conf, _fd__c._f_get_deep__, expected)
+    res = self._eval_generic__(conf, _fd__c._f_get_deep__, expected, {})
     reason = res.m_reason
     if(reason):
       reason.update_ref(self._updater__)
       pass
     return res
 
-  def _eval_generic__(self, conf, f_get, expected=True):
-    expected_att = (_empty__ if(expected is False) else expected)
+  def explain(self, conf, expected=True):
+    """explain(dict/configuration) -> _eval_result_fd__c
+Like `__call__`, but forces the construction of the reason tree,
+ even when reason collection has been disabled with `fm_result._set_collect_reasons__`
+    """
+    prev = fm_result._set_collect_reasons__(True)
+    try:
+      return self(conf, expected)
+    finally:
+      fm_result._set_collect_reasons__(prev)
+
+  def evaluate_batch(self, confs):
+    """evaluate_batch(iterable[dict/configuration]) -> list[bool]
+Evaluates the feature model on many products at once, returning one boolean per product
+ (equivalent to `bool(self(conf))` for each configuration, without the reason machinery).
+The tree is traversed once to build a flat post-order evaluation plan
+ (with the cross-tree constraints compiled to closures), which is then replayed
+ on every product with plain scratch arrays: no recursion and no per-node result objects.
+    """
+    self._check_lookup_("be called")
+    plan = self.m_eval_plan
+    if(plan is None):
+      plan = []
+      self._eval_plan_rec__(plan)
+      self.m_eval_plan = plan
+    n = len(plan)
+    res = []
+    for conf in confs:
+      values  = [True] * n  # the m_value of each step (consistency of the subtree)
+      nvalues = [None] * n  # the m_nvalue of each step (the value of the feature)
+      sels    = [False] * n # whether the subtree of each step contains a selected feature
+      for i, (node, compute, subs, atts, ctcs, named) in enumerate(plan):
+        nvalue_subs = [nvalues[j] for j in subs]
+        value_subs = True
+        has_sel = False
+        for j in subs:
+          if(not values[j]): value_subs = False
+          if(sels[j]): has_sel = True
+        for att_def in atts:
+          v = conf.get(att_def, _empty__)
+          nvalue_subs.append(False if(v is _empty__) else att_def[1](v))
+        for ctc in ctcs:
+          nvalue_subs.append(ctc(conf))
+        nvalue_sub = compute(nvalue_subs, None)
+        error_local = False
+        if(named):
+          nvalue_local = conf.get(node, _empty__)
+          if(nvalue_local is _empty__): # should never occur
+            error_local = True
+          elif((not nvalue_local) and has_sel):
+            error_local = True
+          elif(nvalue_local and (not nvalue_sub)):
+            error_local = True
+          elif(nvalue_local):
+            has_sel = True
+        else:
+          nvalue_local = nvalue_sub
+        values[i]  = value_subs and (not error_local)
+        nvalues[i] = nvalue_local
+        sels[i]    = has_sel
+      res.append(bool(values[-1] and nvalues[-1])) # the root is the last step of the post-order plan
+    return res
+
+  def _eval_plan_rec__(self, plan):
+    subs = tuple(sub._eval_plan_rec__(plan) for sub in self.children)
+    # the bound _compute__ is stored in the step: one attribute lookup at plan time
+    #  instead of one method dispatch per step per product
+    plan.append( (self, self._compute__, subs, self.attributes, tuple(ctc.compile() for ctc in self.ctcs), (self.name is not None),) )
+    return len(plan) - 1
 
-    results_content = tuple(f_get(el, conf, self._get_expected__(el, i, expected)) for i, el in enumerate(self.children))
-    result_att = tuple(self._manage_attribute__(el, conf, i, self._get_expected__(el, i, expected)) for i, el in enumerate(self.attributes))
-    result_ctc = tuple(el(conf, i, self._get_expected__(el, i, expected)) for i, el in enumerate(self.ctcs))
+  def _eval_generic__(self, conf, f_get, expected=True, cache=None):
+    if(cache is None): cache = {} # memoizes constraint subexpressions shared between ctcs for this call
+    expected_att = (_empty__ if(expected is False) else expected)
 
-    nvalue_subs  = tuple(itertools.chain((el.m_nvalue for el in results_content), (el.m_value for el in itertools.chain(result_att, result_ctc))))
+    sub_expected = self._expected_map__[expected]
+    results_content = tuple(f_get(el, conf, sub_expected, cache) for el in self.children)
+    result_att = tuple(self._manage_attribute__(el, conf, i, sub_expected) for i, el in enumerate(self.attributes))
+    result_ctc = tuple(el(conf, i, sub_expected, cache) for i, el in enumerate(self.ctcs))
+
+    # direct loops instead of itertools.chain over generators: this is the hot path,
+    #  and each generator/chain wrapper costs more than the work it feeds to _compute__
+    nvalue_subs = []
+    value_subs = True
+    snodes = []
+    for el in results_content:
+      nvalue_subs.append(el.m_nvalue)
+      if(not el.m_value): value_subs = False
+      snodes.extend(el.m_snodes)
+    for el in result_att:
+      nvalue_subs.append(el.m_value)
+    for el in result_ctc:
+      nvalue_subs.append(el.m_value)
     nvalue_local = None
     nvalue_sub = self._compute__(nvalue_subs, nvalue_local)
-    value_subs = all(el.m_value for el in results_content)
-    snodes = tuple(v for el in results_content for v in el.m_snodes)
+    snodes = tuple(snodes)
 
     # check consistency with name
+    collect = fm_result._collect_reasons__
     reason = None
+    error_local = False
     if(self.name is not None):
       nvalue_local = conf.get(self, _empty__)
       if(nvalue_local is _empty__): # should never occur
-        reason = reason_tree__c(self, 0)
-        reason.add_reason_value_none(self)
+        error_local = True
+        if(collect):
+          reason = reason_tree__c(self, 0)
+          reason.add_reason_value_none(self)
       elif((not nvalue_local) and snodes):
-        reason = reason_tree__c(self, 0)
-        reason.add_reason_dependencies(self, snodes)
+        error_local = True
+        if(collect):
+          reason = reason_tree__c(self, 0)
+          reason.add_reason_dependencies(self, snodes)
       elif(nvalue_local and (not nvalue_sub)):
-        reason = reason_tree__c(self, 0)
-        reason.add_reason_value_mismatch(self, True, False)
+        error_local = True
+        if(collect):
+          reason = reason_tree__c(self, 0)
+          reason.add_reason_value_mismatch(self, True, False)
       elif(nvalue_local):
         snodes = snodes + (self,)
     else:
       nvalue_local = nvalue_sub
 
-    value = value_subs and (reason is None)
+    value = value_subs and (not error_local)
 
-    if((nvalue_local != expected) or (not value)):
+    if(collect and ((nvalue_local != expected) or (not value))):
       if(reason is None): reason = reason_tree__c(self, 0)
       if((nvalue_local != expected)):
         reason.add_reason_value_mismatch(self, nvalue_local, expected)
@@ -367,37 +552,41 @@ Computes the lookup mapping (i.e., the mapping partial path -> feature) for this
 
     return _eval_result_fd__c(value, reason, nvalue_local, snodes)
 
-  def _f_get_shallow__(self, conf, expected=True):
+  def _f_get_shallow__(self, conf, expected=True, cache=None):
     if(self.name is None):
-      return self._eval_generic__(conf, _fd__c._f_get_shallow__, expected)
+      return self._eval_generic__(conf, _fd__c._f_get_shallow__, expected, cache)
     else:
       nvalue = conf.get(self, _empty__)
-      if(v is _empty__):
-        reason = reason_tree__c(self, 0)
-        reason.add_reason_value_none(self)
+      if(nvalue is _empty__):
+        reason = None
+        if(fm_result._collect_reasons__):
+          reason = reason_tree__c(self, 0)
+          reason.add_reason_value_none(self)
         value = False
         nvalue = False
         return _eval_result_fd__c(value, reason, nvalue, ())
       else:
         return _eval_result_fd__c(True, None, nvalue, ())
 
-  def _f_get_deep__(self, conf, expected=True):
-    return self._eval_generic__(conf, _fd__c._f_get_deep__, expected)
+  def _f_get_deep__(self, conf, expected=True, cache=None):
+    return self._eval_generic__(conf, _fd__c._f_get_deep__, expected, cache)
 
   def _manage_attribute__(self, att, conf, idx, expected):
     name, spec = att
     value = conf.get(att, _empty__)
     if(value is _empty__):
       # if(expected):
-        reason = reason_tree__c(self, 0)
-        reason.add_reason_value_none(att)
+        reason = None
+        if(fm_result._collect_reasons__):
+          reason = reason_tree__c(self, 0)
+          reason.add_reason_value_none(att)
         return eval_result__c(False, reason)
       # else:
       #   print("eval_result__c(False, None)")
       #   return eval_result__c(False, None)
     else:
       res = spec(value)
-      if(expected == res):
+      if((expected == res) or (not fm_result._collect_reasons__)):
         return eval_result__c(res, None)
       else:
         reason = reason_tree__c(self, 0)
@@ -406,8 +595,6 @@ Computes the lookup mapping (i.e., the mapping partial path -> feature) for this
 
   def _compute__(self, values, nvalue):
     raise NotImplementedError()
-  def _get_expected__(self, el, i, expected):
-    raise NotImplementedError()
   def _infer_sv__(self, is_true_d):
     raise NotImplementedError()
 
@@ -448,26 +635,30 @@ Currently, this method is only implemented for feature models without attributes
   ##########################################
   # internal: lookup generation
 
-  def _generate_lookup_rec__(self, path_to_self, idx, lookup, dom, errors):
-    # print(f"_generate_lookup_rec__([{self.__class__.__name__}]{self.name}, {idx}, {path_to_self}, {lookup}, {errors})")
-    # 1. if local names, add it to the table, and check no duplicates
-    path_to_self.append(str(idx) if(self.name is None) else self.name)
-    local_path = path__c(path_to_self)
-    lookup.insert(self, local_path, errors)
-    dom[self] = local_path
-    # 2. add subs
-    for i, sub in enumerate(self.children):
-      sub._generate_lookup_rec__(path_to_self, i, lookup, dom, errors)
-    # 3. add attributes
-    for att_def in self.attributes:
-      att_path = local_path + att_def[0]
-      lookup.insert(att_def, att_path, errors)
-      # _fd__c._check_duplicate__(att_def, att_def[0], local_path, lookup, errors)
-      dom[att_def] = att_path
-    # 4. check ctcs
-    self.ctcs = tuple(ctc.link(local_path, lookup, errors) for ctc in self.ctcs)
-    # 5. reset path_to_self
-    path_to_self.pop()
+  def _generate_lookup__(self, lookup, dom, errors):
+    # iterative DFS with an explicit stack: one Python frame for the whole traversal
+    #  instead of one per feature, and no depth limit on generated FDs.
+    # Each feature is visited twice: on entry its name is declared,
+    #  on exit (once its whole subtree is in the lookup) its attributes are declared and its ctcs linked
+    path = []
+    stack = [(self, 0, None)]
+    while(stack):
+      node, idx, local_path = stack.pop()
+      if(local_path is None): # entry visit
+        path.append(str(idx) if(node.name is None) else node.name)
+        local_path = path__c(path)
+        lookup.insert(node, local_path, errors)
+        dom[node] = local_path
+        stack.append( (node, idx, local_path,) )
+        for i in range(len(node.children) - 1, -1, -1):
+          stack.append( (node.children[i], i, None,) )
+      else: # exit visit
+        for att_def in node.attributes:
+          att_path = local_path + att_def[0]
+          lookup.insert(att_def, att_path, errors)
+          dom[att_def] = att_path
+        node.ctcs = tuple(ctc.link(local_path, lookup, errors) for ctc in node.ctcs)
+        path.pop()
 
   ##########################################
   # internal: configuration nf API
@@ -479,65 +670,215 @@ Currently, this method is only implemented for feature models without attributes
       raise ValueError(f"ERROR: a configuration must be either a configuration__c or a dict (found {type(conf)})")
     return conf.link(self.m_lookup)
 
+  def _all_nodes__(self):
+    """_all_nodes__() -> tuple[_fd__c]
+Flat pre-order tuple of all the features of this tree (parents before their children).
+The tuple is cached until the next call to `clean`, like the other generated data.
+    """
+    res = self.m_all_nodes
+    if(res is None):
+      acc = []
+      stack = [self]
+      while(stack):
+        node = stack.pop()
+        acc.append(node)
+        stack.extend(reversed(node.children))
+      res = tuple(acc)
+      self.m_all_nodes = res
+    return res
+
+  def _close_plan__(self):
+    """_close_plan__() -> tuple | bool
+Flat array encoding of this tree for the `_fast._fm_close_sweeps__` kernel
+ (the node list, one kind per feature, and the children spans into a flat index array),
+ or `False` when a feature has an inference rule unknown to the kernel.
+The encoding is cached until the next call to `clean`, like the other generated data.
+    """
+    res = self.m_close_plan
+    if(res is None):
+      nodes = self._all_nodes__()
+      index = {node: i for i, node in enumerate(nodes)}
+      kinds = []
+      child_beg = []
+      child_end = []
+      children = []
+      for node in nodes:
+        f = type(node)._infer_sv__
+        if(f is FDAnd._infer_sv__): kinds.append(_fast._fd_kind_and__)
+        elif(f is _fd_infer_sv_group__): kinds.append(_fast._fd_kind_group__)
+        elif(f is FDXor._infer_sv__): kinds.append(_fast._fd_kind_xor__)
+        else: # custom inference rule: the generic sweeps must be used
+          self.m_close_plan = False
+          return False
+        child_beg.append(len(children))
+        children.extend(index[sub] for sub in node.children)
+        child_end.append(len(children))
+      if(_fast._jit_enabled__): # numba kernels work on numpy arrays (numba implies numpy)
+        kinds     = numpy.array(kinds, dtype=numpy.int32)
+        child_beg = numpy.array(child_beg, dtype=numpy.int32)
+        child_end = numpy.array(child_end, dtype=numpy.int32)
+        children  = numpy.array(children, dtype=numpy.int32)
+      res = (nodes, kinds, child_beg, child_end, children,)
+      self.m_close_plan = res
+    return res
+
   def _close_configuration_1__(self, is_true_d):
-    idx, v_local, v_subs = self._infer_sv__(is_true_d)
-    self._make_product_update__(is_true_d, idx, v_local, v_subs)
-    for sub in self.children:
-      sub._close_configuration_1__(is_true_d)
-    idx, v_local, v_subs = self._infer_sv__(is_true_d)
-    self._make_product_update__(is_true_d, idx, v_local, v_subs)
+    # fast path: encode the relevant entries of is_true_d into two flat int arrays,
+    #  run both sweeps in the _fast kernel (jitted when numba is available),
+    #  and decode the updated entries back
+    plan = self._close_plan__()
+    if(plan is not False):
+      nodes, kinds, child_beg, child_end, children = plan
+      n = len(nodes)
+      vals = [_fast._sv_empty__] * n
+      idxs = [-1] * n
+      encoded = True
+      for i, node in enumerate(nodes):
+        e = is_true_d.get(node)
+        if(e is not None):
+          v = e[0]
+          if(type(v) is not bool): # non-boolean selected value: outside the kernel encoding
+            encoded = False
+            break
+          vals[i] = _fast._sv_true__ if(v) else _fast._sv_false__
+          idxs[i] = e[1]
+      if(encoded):
+        if(_fast._jit_enabled__):
+          vals = numpy.array(vals, dtype=numpy.int64)
+          idxs = numpy.array(idxs, dtype=numpy.int64)
+          stamps = numpy.zeros(n, dtype=numpy.int64)
+        else:
+          stamps = [0] * n
+        _fast._fm_close_sweeps__(kinds, child_beg, child_end, children, vals, idxs, stamps)
+        for i, node in enumerate(nodes):
+          v = vals[i]
+          if(v != _fast._sv_empty__):
+            is_true_d[node] = (bool(v == _fast._sv_true__), int(idxs[i]),)
+        return (vals, idxs,) # the final sweep state, reusable by _close_configuration_2__
+    # generic path: two iterative sweeps over the flat node list
+    #  (the forward sweep updates every feature before its children, the backward sweep after them;
+    #   each `_infer_sv__`/`_make_product_update__` pair only touches a feature and its direct children,
+    #   so swapping updates of disjoint subtrees does not change the result)
+    nodes = self._all_nodes__()
+    for node in nodes:
+      idx, v_local, v_subs = node._infer_sv__(is_true_d)
+      node._make_product_update__(is_true_d, idx, v_local, v_subs)
+    for node in reversed(nodes):
+      idx, v_local, v_subs = node._infer_sv__(is_true_d)
+      node._make_product_update__(is_true_d, idx, v_local, v_subs)
 
   def _make_product_update__(self, is_true_d, idx, v_local, v_subs):
-    if(v_local is not _empty__):
-      is_true_d[self] = (v_local, idx)
-    for sub, v_sub in zip(self.children, v_subs):
-      if(v_sub is not _empty__):
-        is_true_d[sub] = (v_sub, idx)
-
-  def _close_configuration_2__(self, v_local, is_true_d, res):
-    _, _, v_subs = self._infer_sv__(is_true_d)
-    res[self] = v_local
-    for sub, v_sub in zip(self.children, v_subs):
-      if(v_sub is _empty__):
-        sub._close_configuration_2__(False, is_true_d, res)
+    # all the written entries share the same idx, so at most two distinct boolean
+    #  entries exist per update: preallocate them instead of building one tuple
+    #  per written feature
+    entry_true  = (True, idx,)
+    entry_false = (False, idx,)
+    empty = _empty__ # hoisted: LOAD_FAST instead of LOAD_GLOBAL on every sentinel test
+    if(v_local is not empty):
+      if(v_local is True):    is_true_d[self] = entry_true
+      elif(v_local is False): is_true_d[self] = entry_false
+      else:                   is_true_d[self] = (v_local, idx,)
+    # index iteration: no zip object nor pairing tuple per written feature
+    children = self.children
+    for i in range(len(children)):
+      v_sub = v_subs[i]
+      if(v_sub is not empty):
+        sub = children[i]
+        if(v_sub is True):    is_true_d[sub] = entry_true
+        elif(v_sub is False): is_true_d[sub] = entry_false
+        else:                 is_true_d[sub] = (v_sub, idx,)
+
+  def _close_configuration_2__(self, v_local, is_true_d, res, sv=None):
+    # iterative top-down sweep: the pre-order node list guarantees that the value
+    #  of every feature is decided (from its parent's `_infer_sv__`) before it is visited.
+    # When the close plan is available, its dense feature numbering backs the decided
+    #  values with a flat list (indexed via the children spans, no hashing per feature)
+    empty = _empty__ # hoisted: LOAD_FAST instead of LOAD_GLOBAL on every sentinel test
+    plan = self._close_plan__()
+    if((plan is not False) and (sv is not None)):
+      # the first pass ended on the state in `sv` and nothing changed it since:
+      #  all the decided values are computed from it in the _fast kernel,
+      #  with no per-feature inference at all
+      nodes, kinds, child_beg, child_end, children = plan
+      vals, idxs = sv
+      if(_fast._jit_enabled__):
+        decided = numpy.zeros(len(nodes), dtype=numpy.int64)
       else:
-        sub._close_configuration_2__(v_sub, is_true_d, res)
-    # if feature selected, need to include the attribute 
-    if(v_local):
-      for att_def in self.attributes:
-        v = is_true_d.get(att_def, _empty__)
-        if(v is not _empty__):
-          res[att_def] = v[0]
+        decided = [0] * len(nodes)
+      decided[0] = (1 if(v_local) else 0)
+      _fast._fm_close_decide__(kinds, child_beg, child_end, children, vals, idxs, decided)
+      for i, node in enumerate(nodes):
+        dv = bool(decided[i])
+        res[node] = dv
+        # if feature selected, need to include the attribute
+        if(dv):
+          for att_def in node.attributes:
+            v = is_true_d.get(att_def, empty)
+            if(v is not empty):
+              res[att_def] = v[0]
+      return
+    if(plan is not False):
+      nodes, kinds, child_beg, child_end, children = plan
+      v_locals = [False] * len(nodes)
+      v_locals[0] = v_local
+      for i, node in enumerate(nodes):
+        v_local = v_locals[i]
+        _, _, v_subs = node._infer_sv__(is_true_d)
+        res[node] = v_local
+        beg = child_beg[i]
+        for k, v_sub in enumerate(v_subs):
+          v_locals[children[beg + k]] = (False if(v_sub is empty) else v_sub)
+        # if feature selected, need to include the attribute
+        if(v_local):
+          for att_def in node.attributes:
+            v = is_true_d.get(att_def, empty)
+            if(v is not empty):
+              res[att_def] = v[0]
+      return
+    v_locals = {self: v_local}
+    for node in self._all_nodes__():
+      v_local = v_locals[node]
+      _, _, v_subs = node._infer_sv__(is_true_d)
+      res[node] = v_local
+      children = node.children
+      for k in range(len(children)):
+        v_sub = v_subs[k]
+        v_locals[children[k]] = (False if(v_sub is empty) else v_sub)
+      # if feature selected, need to include the attribute
+      if(v_local):
+        for att_def in node.attributes:
+          v = is_true_d.get(att_def, empty)
+          if(v is not empty):
+            res[att_def] = v[0]
 
   @staticmethod
   def _make_product_extract_utils__(is_true_d, domain, expected=True):
+    # plain loops with the dict lookup bound once:
+    #  no closure-cell rebinding and no Python-level call per element
     idx = -1
+    get = is_true_d.get
+    empty = _empty__
     if(expected is None):
-      value = _empty__
-      def f(val):
-        nonlocal idx
-        nonlocal value
-        if(val is _empty__): 
-          return val
-        else:
-          if(val[1] > idx):
-            idx = val[1]
-            value = val[0]
-          return val[0]
+      value = empty
       for sub in domain:
-        f(is_true_d.get(sub, _empty__))
+        val = get(sub, empty)
+        if(val is empty): continue
+        if(val[1] > idx):
+          idx = val[1]
+          value = val[0]
       return idx, value
-    else:      
-      def f(val):
-        nonlocal idx
-        if(val is _empty__): 
-          return val
+    else:
+      v_subs = []
+      add = v_subs.append
+      for sub in domain:
+        val = get(sub, empty)
+        if(val is empty):
+          add(val)
         else:
           if((val[0] == expected) and (val[1] > idx)):
             idx = val[1]
-          return val[0]
-      v_subs = tuple(f(is_true_d.get(sub, _empty__)) for sub in domain)
-      return idx, v_subs
+          add(val[0])
+      return idx, tuple(v_subs)
 
   def _updater__(self, ref):
     return self.m_dom.get(ref, ref)
@@ -552,61 +893,88 @@ __fd__c_slots_core__ = frozenset(itertools.chain(
 # 2. FD groups
 
 class FDAnd(_fd__c):
+  __slots__ = ()
   def __init__(self, *args, **kwargs):
     _fd__c.__init__(self, *args, **kwargs)
+  _expected_map__ = {True: True, False: None, None: None}
   def _compute__(self, values, nvalue):
     return all(values)
-  def _get_expected__(self, el, i, expected):
-    return (True if(expected) else None)
   def _infer_sv__(self, is_true_d):
-    idx, value = self._make_product_extract_utils__(is_true_d, itertools.chain((self,), self.children), expected=None)
-    def get_default(el):
-      val = is_true_d.get(el, _empty__)
-      if((val is _empty__) or (val[1] < idx)):
-        return value
-      else:
-        return val[0]
-    v_local = get_default(self)
-    return idx, v_local, tuple(get_default(sub) for sub in self.children)
+    # open-coded scan for the max-idx witness over self then its children:
+    #  no itertools.chain layer and no tuple allocation per call.
+    # The children entries are collected during the scan,
+    #  so each feature is fetched from the dict exactly once
+    get = is_true_d.get
+    empty = _empty__
+    idx = -1
+    value = empty
+    val_self = get(self, empty)
+    if(val_self is not empty):
+      idx = val_self[1]
+      value = val_self[0]
+    entries = []
+    add = entries.append
+    for sub in self.children:
+      val = get(sub, empty)
+      add(val)
+      if((val is not empty) and (val[1] > idx)):
+        idx = val[1]
+        value = val[0]
+    v_local = (value if((val_self is empty) or (val_self[1] < idx)) else val_self[0])
+    v_subs = []
+    for val in entries:
+      v_subs.append(value if((val is empty) or (val[1] < idx)) else val[0])
+    return idx, v_local, tuple(v_subs)
   def _to_dimacs_content_(self, vroot, it, dimacs_obj):
     for vsub in it:
       dimacs_obj.add_clause( (vroot, anot (vsub),) )
       dimacs_obj.add_clause( (anot (vroot), vsub,) )
 
+def _fd_infer_sv_group__(self, is_true_d):
+  """_fd_infer_sv_group__(dict) -> (int, bool, tuple)
+Shared `_infer_sv__` implementation of `FDAny` and `FDOr` (their inference rule is the same):
+ a single loop over the children, inlining the expected=True scan of `_make_product_extract_utils__`
+  """
+  get = is_true_d.get
+  empty = _empty__
+  idx_subs = -1
+  v_subs = []
+  add = v_subs.append
+  for sub in self.children:
+    val = get(sub, empty)
+    if(val is empty):
+      add(val)
+    else:
+      if((val[0] == True) and (val[1] > idx_subs)):
+        idx_subs = val[1]
+      add(val[0])
+  v_local, idx_local = get(self, (False, -1))
+  if(idx_subs > idx_local):
+    idx_local = idx_subs
+    v_local = True
+  return idx_local, v_local, tuple(v_subs)
+
+
 class FDAny(_fd__c):
+  __slots__ = ()
   def __init__(self, *args, **kwargs):
     _fd__c.__init__(self, *args, **kwargs)
+  _expected_map__ = {True: None, False: None, None: None}
   def _compute__(self, values, nvalue):
     return True
-  def _get_expected__(self, el, i, expected):
-    return None
-  def _infer_sv__(self, is_true_d):
-    # tuple((is_true_d.get(sub, (_empty__, -1))[0]) for sub in self.children)
-    idx_subs, v_subs = self._make_product_extract_utils__(is_true_d, self.children)
-    v_local, idx_local = is_true_d.get(self, (False, -1))
-    if(idx_subs > idx_local):
-      idx_local = idx_subs
-      v_local = True
-    return idx_local, v_local, v_subs
+  _infer_sv__ = _fd_infer_sv_group__
   def _to_dimacs_content_(self, vroot, it, dimacs_obj):
     for vsub in it:
       dimacs_obj.add_clause( (vroot, anot (vsub),) )
 
 class FDOr(_fd__c):
+  __slots__ = ()
   def __init__(self, *args, **kwargs):
     _fd__c.__init__(self, *args, **kwargs)
+  _expected_map__ = {True: None, False: False, None: False}
   def _compute__(self, values, nvalue):
     return any(values)
-  def _get_expected__(self, el, i, expected):
-    return (False if(not expected) else None)
-  def _infer_sv__(self, is_true_d):
-    # tuple((is_true_d.get(sub, (_empty__, -1))[0]) for sub in self.children)
-    idx_subs, v_subs = self._make_product_extract_utils__(is_true_d, self.children)
-    v_local, idx_local = is_true_d.get(self, (False, -1))
-    if(idx_subs > idx_local):
-      idx_local = idx_subs
-      v_local = True
-    return idx_local, v_local, v_subs
+  _infer_sv__ = _fd_infer_sv_group__
   def _to_dimacs_content_(self, vroot, it, dimacs_obj):
     vsubs = list(it)
     for vsub in vsubs:
@@ -615,17 +983,20 @@ class FDOr(_fd__c):
     dimacs_obj.add_clause( vsubs )
 
 class FDXor(_fd__c):
+  __slots__ = ()
   def __init__(self, *args, **kwargs):
     _fd__c.__init__(self, *args, **kwargs)
+  _expected_map__ = {True: None, False: None, None: None}
   def _compute__(self, values, nvalue):
-    res = False
-    for element in values:
-      if(element):
-        if(res): return False
-        else: res = True
-    return res
-  def _get_expected__(self, el, i, expected):
-    return None
+    # early-exit count: measured faster than the sum(map(bool, values)) == 1 reduction
+    #  at every group width (the values are already booleans here, and a second True
+    #  settles the result immediately)
+    c = 0
+    for v in values:
+      if(v):
+        c += 1
+        if(c > 1): return False
+    return (c == 1)
   def _infer_sv__(self, is_true_d):
     idx_subs, v_subs = self._make_product_extract_utils__(is_true_d, self.children)
     v_local, idx_local = is_true_d.get(self, (False, -1))
@@ -633,7 +1004,12 @@ class FDXor(_fd__c):
       idx_local = idx_subs
       v_local = True
     if(idx_subs > -1):
-      v_subs = tuple((is_true_d.get(sub, (False, -1)) == (True, idx_subs)) for sub in self.children)
+      get = is_true_d.get
+      v_subs = []
+      for sub in self.children:
+        val = get(sub, None)
+        v_subs.append((val is not None) and (val[0] == True) and (val[1] == idx_subs))
+      v_subs = tuple(v_subs)
     return idx_local, v_local, v_subs
   def _to_dimacs_content_(self, vroot, it, dimacs_obj):
     vsubs = list(it)
@@ -647,8 +1023,8 @@ class FDXor(_fd__c):
 ##########################################
 # 3. FD aliases
 
-class FD(FDAnd): pass
-class FDMandatory(FDAnd): pass
-class FDOptional(FDAny): pass
-class FDAlternative(FDXor): pass
+class FD(FDAnd): __slots__ = ()
+class FDMandatory(FDAnd): __slots__ = ()
+class FDOptional(FDAny): __slots__ = ()
+class FDAlternative(FDXor): __slots__ = ()
 
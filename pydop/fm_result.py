@@ -136,86 +136,60 @@ Adds the error that `location/name` is the unique path of the two variables `obj
 
 
 ##########################################
-# 2. constraint and fm evaluation
-
-class _reason_value_mismatch__c(object):
-  __slots__ = ("m_name", "m_ref", "m_val", "m_expected",)
-  def __init__(self, ref, val, expected=None):
-    self.m_ref = ref
-    self.m_val = val
-    self.m_expected = expected
-  def update_ref(self, updater): self.m_ref = updater(self.m_ref)
-  def __str__(self):
-    if(self.m_expected is None):
-      return f"{self.m_ref} is {self.m_val}"
-    else:
-      return f"{self.m_ref} is {self.m_val} (expected: {self.m_expected})"
+# 2. reason collection toggle
 
-class _reason_value_none__c(object):
-  __slots__ = ("m_ref",)
-  def __init__(self, ref):
-    self.m_ref = ref
-  def update_ref(self, updater): self.m_ref = updater(self.m_ref)
-  def __str__(self):
-    return f"{self.m_ref} has no value in the input configuration"
+# When False, evaluations only compute their boolean result and skip the construction
+#  of the reason trees below (the fast path for search-like workflows evaluating many products).
+# The `explain` methods of `_expbool__c` and `_fd__c` locally re-enable the collection.
+_collect_reasons__ = True
 
-class _reason_dependencies__c(object):
-  __slots__ = ("m_ref", "m_deps",)
-  def __init__(self, ref, deps):
-    self.m_ref = ref
-    self.m_deps = deps
-  def update_ref(self, updater):
-    self.m_ref = updater(self.m_ref)
-    self.m_deps = tuple(updater(el) for el in self.m_deps)
-  def __str__(self):
-    tmp = ', '.join(f"\"{el}\"" for el in self.m_deps)
-    return f"{self.m_ref} should be True due to dependencies (found: {tmp})"
-
-class _reason_value_none__c(object):
-  __slots__ = ("m_ref",)
-  def __init__(self, ref):
-    self.m_ref = ref
-  def update_ref(self, updater): self.m_ref = updater(self.m_ref)
-  def __str__(self):
-    return f"{self.m_ref} has no value in the input configuration"
+def _set_collect_reasons__(flag):
+  """_set_collect_reasons__(bool) -> bool
+Sets whether evaluations construct reason trees, and returns the previous setting
+  """
+  global _collect_reasons__
+  res = _collect_reasons__
+  _collect_reasons__ = flag
+  return res
 
-class _reason_dependencies__c(object):
-  __slots__ = ("m_ref", "m_deps",)
-  def __init__(self, ref, deps):
-    self.m_ref = ref
-    self.m_deps = deps
-  def update_ref(self, updater):
-    self.m_ref = updater(self.m_ref)
-    self.m_deps = tuple(updater(el) for el in self.m_deps)
-  def __str__(self):
-    tmp = ', '.join(f"\"{el}\"" for el in self.m_deps)
-    return f"{self.m_ref} should be True due to dependencies (found: {tmp})"
+
+##########################################
+# 3. constraint and fm evaluation
+
+# The local entries of a reason tree are stored in a struct-of-arrays layout
+#  (one allocation per array instead of one object per entry):
+#  `m_kinds[i]` tags the kind of the i-th entry, whose fields live in the
+#  parallel arrays `m_refs`/`m_vals`/`m_expected`/`m_deps` (unused fields are None).
+_reason_kind_mismatch__ = 0  # a variable whose value is not the expected one
+_reason_kind_none__     = 1  # a variable with no value in the input configuration
+_reason_kind_deps__     = 2  # a variable that should be True due to dependencies
 
 
 ## main class
 
 class reason_tree__c(object):
-  __slots__ = ("m_ref", "m_local", "m_subs", "m_count",)
+  __slots__ = ("m_ref", "m_kinds", "m_refs", "m_vals", "m_expected", "m_deps", "m_subs", "m_count",)
   def __init__(self, name, idx):
     self.m_ref = f"[{idx}]" if(name is None) else name
-    self.m_local = []
+    self.m_kinds = bytearray()
+    self.m_refs = []
+    self.m_vals = []
+    self.m_expected = []
+    self.m_deps = []
     self.m_subs = []
     self.m_count = 0
 
   def add_reason_value_mismatch(self, ref, val, expected=None):
     # print(f"add_reason_value_mismatch({ref.name}, {val}, {expected})")
-    self.m_local.append(_reason_value_mismatch__c(ref, val, expected))
-    self.m_count += 1
+    self._add_entry__(_reason_kind_mismatch__, ref, val, expected, None)
     return self
   def add_reason_value_none(self, ref):
     # print(f"add_reason_value_none({ref})")
-    self.m_local.append(_reason_value_none__c(ref))
-    self.m_count += 1
+    self._add_entry__(_reason_kind_none__, ref, None, None, None)
     return self
   def add_reason_dependencies(self, ref, deps):
     # print(f"add_reason_dependencies({ref}, {deps})")
-    self.m_local.append(_reason_dependencies__c(ref, deps))
-    self.m_count += 1  
+    self._add_entry__(_reason_kind_deps__, ref, None, None, deps)
     return self
   def add_reason_sub(self, sub):
     # print(f"add_reason_sub({sub})")
@@ -224,31 +198,56 @@ class reason_tree__c(object):
       self.m_count += 1
     return self
 
+  def _add_entry__(self, kind, ref, val, expected, deps):
+    self.m_kinds.append(kind)
+    self.m_refs.append(ref)
+    self.m_vals.append(val)
+    self.m_expected.append(expected)
+    self.m_deps.append(deps)
+    self.m_count += 1
+
+  def _entry_str__(self, i):
+    kind = self.m_kinds[i]
+    if(kind == _reason_kind_mismatch__):
+      if(self.m_expected[i] is None):
+        return f"{self.m_refs[i]} is {self.m_vals[i]}"
+      else:
+        return f"{self.m_refs[i]} is {self.m_vals[i]} (expected: {self.m_expected[i]})"
+    elif(kind == _reason_kind_none__):
+      return f"{self.m_refs[i]} has no value in the input configuration"
+    else:
+      tmp = ', '.join(f"\"{el}\"" for el in self.m_deps[i])
+      return f"{self.m_refs[i]} should be True due to dependencies (found: {tmp})"
+
   def update_ref(self, updater):
     self.m_ref = updater(self.m_ref)
-    for el in itertools.chain(self.m_local, self.m_subs):
+    for i in range(len(self.m_kinds)):
+      self.m_refs[i] = updater(self.m_refs[i])
+      if(self.m_kinds[i] == _reason_kind_deps__):
+        self.m_deps[i] = tuple(updater(el) for el in self.m_deps[i])
+    for el in self.m_subs:
       el.update_ref(updater)
 
   def _tostring__(self, indent):
     if(self.m_count == 0):
       return ""
     elif(self.m_count == 1):
-      if(self.m_local):
-        return f"{indent}{self.m_ref}: {self.m_local[0]}"
+      if(self.m_kinds):
+        return f"{indent}{self.m_ref}: {self._entry_str__(0)}"
       else:
         return f"{indent}{self.m_ref}: {self.m_subs[0]._tostring__(indent)}"
     else:
       res = f"{indent}{self.m_ref}: (\n"
       indent_more = f"{indent} "
-      for e in self.m_local:
-        res += f"{indent_more}{e}\n"
+      for i in range(len(self.m_kinds)):
+        res += f"{indent_more}{self._entry_str__(i)}\n"
       for s in self.m_subs:
         res += s._tostring__(indent_more) + "\n"
       res += f"{indent})"
       return res
 
   def __len__(self): return self.m_count
-  def __iter__(self): return itertools.chain(iter(self.m_local), iter(self.m_subs))
+  def __iter__(self): return itertools.chain((self._entry_str__(i) for i in range(len(self.m_kinds))), iter(self.m_subs))
   def __bool__(self): return (self.m_count != 0)
   def __str__(self): return self._tostring__("")
 
@@ -258,6 +257,9 @@ class reason_tree__c(object):
 ################################################################################
 
 class eval_result__c(object):
+  # each slot must be declared exactly once in the class hierarchy
+  #  (re-listing a slot in a subclass would waste a descriptor and per-instance space):
+  #  the fd-specific fields are declared in fm_diagram._eval_result_fd__c only
   __slots__ = ("m_value", "m_reason",)
   def __init__(self, value, reason):
     self.m_value  = value   # the result of the evaluation
@@ -29,7 +29,7 @@ from pydop.utils import _empty__
 ###############################################################################
 
 def default_factory(spl_id, *args, **kwargs):
-  return SPL(*args, **kwars)
+  return SPL(*args, **kwargs)
 
 
 
@@ -52,7 +52,7 @@ class MPL(object):
   def add(self, spl_id, spl):
     self._check_name__(spl_id)
     self._check_name__(spl)
-    return self._add__(spl_id, res)
+    return self._add__(spl_id, spl)
 
   def __setitem__(self, spl_id, spl):
     return self.add(spl_id, spl)
@@ -65,11 +65,11 @@ class MPL(object):
 
   ## getters
   def get_spl(self, spl_id, default=None):
-    return self.m_reg.get(key, default)
+    return self.m_reg.get(spl_id, default)
 
   def get_variant(self, spl_id, conf, default=None):
     global _empty__
-    spl = self.m_reg.get(key, _empty__)
+    spl = self.m_reg.get(spl_id, _empty__)
     if(spl is not _empty__):
       return spl(conf)
     else:
@@ -45,7 +45,7 @@ class wrapper_cls(object):
   __slots__ = ("m_content")
   def __init__(self, content):
     object.__setattr__(self, "m_content", content)
-  def get_content(self): return object.__getattribute__(el, "m_content")
+  def get_content(self): return object.__getattribute__(self, "m_content")
 
 def unwrap(el):
   while(issubclass(type(el), wrapper_cls)):
@@ -366,7 +366,7 @@ class wrapper_sharing_cls(wrapper_cls):
     if(prev is not _obj__):
       object.__getattribute__(prev, "m_parents").remove(self) # this link between self and prev is broken
     res = wrapper_sharing_ensure(value, self)
-    local_dict[name] = res
+    local_dict[key] = res
     # reset real
     object.__getattribute__(self, "_reset__")()
     return res
@@ -374,11 +374,12 @@ class wrapper_sharing_cls(wrapper_cls):
   def __getitem__(self, key):
     global _obj__
     local_dict = object.__getattribute__(self, "m_local_dict")
-    res = local_dict.get(name, _obj__)
+    res = local_dict.get(key, _obj__)
     if(res is _obj__):
       content = object.__getattribute__(self, "m_content")
+      res = content[key]
       # possibly, content will be updated: need to store it locally
-      res = self[name] = content
+      res = object.__getattribute__(self, "__setitem__")(key, res)
     return res
 
   def _reset__(self):
@@ -394,7 +395,7 @@ def wrapper_sharing_ensure(obj, parent=None):
   # print(f"wrapper_sharing_ensure({obj}, {parent})")
   if(type(obj) is wrapper_sharing_cls):
     if(parent is not None):
-      object.__getattribute__(self, "m_parent").append(parent)
+      object.__getattribute__(obj, "m_parents").append(parent)
     return obj
   else:
     return wrapper_sharing_cls(obj, parent)
@@ -422,11 +423,11 @@ def extract_module_and_name(param):
     else:
       sys.modules.pop(name)
       is_local = False
-  elif(isinstance(module, (list, tuple))):
-    tmp = module
+  elif(isinstance(param, (list, tuple))):
+    tmp = param
     name = tmp[0]
     module, _, is_local = extract_module_and_name(tmp[1])
-  elif(isinstance(param, module_c)):
+  elif(isinstance(param, _module_class_)):
     module = param
     name = module.__name__
     is_local = False
@@ -24,6 +24,13 @@
 import itertools
 import bisect
 
+from pydop._fast import _interval_contains__, _domain_contains__
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
 ##########################################
 # the empty object, for get API
 
@@ -44,6 +51,7 @@ _empty__ = _empty_c__()
 class path__c(tuple):
   __slots__ = ()
   def __new__(cls, content=()):
+    if(type(content) is path__c): return content # already flattened, and immutable
     return tuple.__new__(path__c, path__c._manage_parameter_(content))
   def __add__(self, suffix):
     return path__c(itertools.chain(self, path__c._manage_parameter_(suffix)))
@@ -62,39 +70,57 @@ class path__c(tuple):
       try:
         for el in param:
           yield from path__c._manage_parameter_(el)
-      except TypeError as e:
-        print(e, dir(e), e.args)
+      except TypeError:
         yield param
 
 
+"""Memoizes the path__c conversion of reference strings (paths are immutable, so sharing them is safe)"""
+_path_of_str__ = {}
+
+
 ################################################################################
 # path lookup class
 ################################################################################
 
+class _prefix_node__c(object):
+  """Node of the per-name prefix trees indexing the declarations of lookup__c.
+Edges are interned path components, ordered from the declaration's name up to its root ancestor,
+ so declarations sharing their closest ancestors share their upper trie nodes."""
+  __slots__ = ("m_children", "m_decls",)
+  def __init__(self):
+    self.m_children = {} # mapping {component id: _prefix_node__c}: the next-closer ancestors
+    self.m_decls = []    # the declarations (obj, path) whose reversed path ends exactly on this node
+
+
 class lookup__c(object):
   """Class for variable lookup"""
-  __slots__ = ("m_content",)
+  __slots__ = ("m_content", "m_intern", "m_resolve_cache",)
   def __init__(self):
     self.m_content = {}
+    self.m_intern  = {} # mapping {path component: int}: interns every path component to a small id
+    self.m_resolve_cache = {} # mapping {str: object}: the successfully resolved reference strings (cleared on insert)
 
   def insert(self, obj, path, errors):
     """insert(object, path, decl_errors__c)
 States that `obj` is uniquely identified with `path`.
 Can store a duplication error in the `errors` object in case it is not the case
     """
+    self.m_resolve_cache.clear() # a new declaration can make a cached resolution ambiguous
     name = path[-1]
-    decls = self.m_content.get(name)
-    if(decls is None):
-      self.m_content[name] = [ (obj, path) ]
-    else:
-      other = None
-      for obj_other, path_other in decls:
-        if(path == path_other):
-          other = obj_other
-          break
-      if(other is not None):
-        errors.add_duplicate(path, obj, other)
-      decls.append( (obj, path) )
+    ids = self._intern_path__(path)
+    node = self.m_content.get(name)
+    if(node is None):
+      node = _prefix_node__c()
+      self.m_content[name] = node
+    for c in reversed(ids):
+      sub = node.m_children.get(c)
+      if(sub is None):
+        sub = _prefix_node__c()
+        node.m_children[c] = sub
+      node = sub
+    if(node.m_decls): # a trie node spells a unique path: a declaration already there is an exact duplicate
+      errors.add_duplicate(path, obj, node.m_decls[0][0])
+    node.m_decls.append( (obj, path) )
 
   def get(self, path, location, errors, default=None):
     """get(path, object, decl_errors__c) -> object
@@ -105,11 +131,14 @@ If the path does not correspond to any object, adds an unbound error to `errors`
 If the path corresponds to multiple objects, adds an abiguous error to `errors` and returns `default`.
     """
     name = path[-1]
-    decls = self.m_content.get(name)
-    if(decls is None):
+    node = self.m_content.get(name)
+    if(node is None):
       errors.add_unbound(name, path[:-1])
     else:
-      refs = tuple(filter((lambda data: lookup__c._path_includes__(data[1], path)), decls))
+      intern = self.m_intern
+      rids = tuple(intern.get(c, -1) for c in reversed(path)) # -1 never labels an edge: unknown components cannot match
+      refs = []
+      lookup__c._collect_matches__(node, rids, 0, refs)
       length = len(refs)
       if(length == 0):
         errors.add_unbound(name, path[:-1])
@@ -119,41 +148,79 @@ If the path corresponds to multiple objects, adds an abiguous error to `errors`
         return refs[0][0]
     return default
 
+  def _intern_path__(self, path):
+    """_intern_path__(path) -> tuple[int]
+Returns the path in parameter with every component replaced by its interned id (new components get a fresh id)
+    """
+    intern = self.m_intern
+    res = []
+    for c in path:
+      i = intern.get(c)
+      if(i is None):
+        i = len(intern)
+        intern[c] = i
+      res.append(i)
+    return tuple(res)
+
+  @staticmethod
+  def _collect_matches__(node, rids, pos, refs):
+    """_collect_matches__(_prefix_node__c, tuple[int], int, list)
+Adds to `refs` every declaration in the subtree of `node` whose path includes the query suffix `rids[pos:]`.
+Only the branches sharing components with the query are descended;
+ greedily consuming a query component on its first occurrence is complete for subsequence inclusion.
+    """
+    if(pos == len(rids)):
+      lookup__c._collect_all__(node, refs)
+    else:
+      c = rids[pos]
+      for comp, sub in node.m_children.items():
+        lookup__c._collect_matches__(sub, rids, (pos + 1) if(comp == c) else pos, refs)
+
+  @staticmethod
+  def _collect_all__(node, refs):
+    """_collect_all__(_prefix_node__c, list)
+Adds to `refs` every declaration in the subtree of `node` (all of them match an already-consumed query)
+    """
+    refs.extend(node.m_decls)
+    for sub in node.m_children.values():
+      lookup__c._collect_all__(sub, refs)
+
   def resolve(self, key, location, errors, default=None):
     """resolve(object, object, errors) -> object
 resolve(object, object, errors, object) -> object
 Wrapper around the `get` method, where the path is not yet formated
     """
     try:
-      key_path = path__c(key)
-      return self.get(key_path, location, errors, default)
+      if(type(key) is str): # the same reference strings are resolved over and over:
+        # memoize both the split and (for this lookup) the resolved declaration
+        res = self.m_resolve_cache.get(key)
+        if(res is not None):
+          return res
+        key_path = _path_of_str__.get(key)
+        if(key_path is None):
+          key_path = path__c(key)
+          _path_of_str__[key] = key_path
+        res = self.get(key_path, location, errors, default)
+        if((res is not default) and (res is not None)): # failures must re-report their error on every call
+          self.m_resolve_cache[key] = res
+        return res
+      else:
+        key_path = path__c(key)
+        return self.get(key_path, location, errors, default)
     except ValueError:
       return default
 
 
-  @staticmethod
-  def _path_includes__(p, p_included):
-    """_path_includes__(path, path) -> bool
-Returns if `p_included` is included in `p`
-    """
-    # print(f"_path_includes__({p}, {p_included})")
-    idx_p = 0
-    idx_included = 0
-    len_p = len(p)
-    len_included = len(p_included)
-    while(idx_included < len_included):
-      if(idx_p < len_p):
-        if(p[idx_p] == p_included[idx_included]):
-          idx_included += 1
-        idx_p += 1
-      else:
-        return False
-    return True
-
   def __iter__(self):
-    for v in self.m_content.values():
-      for obj, path in v:
-        yield path
+    for node in self.m_content.values():
+      yield from lookup__c._iter_paths__(node)
+
+  @staticmethod
+  def _iter_paths__(node):
+    for data in node.m_decls:
+      yield data[1]
+    for sub in node.m_children.values():
+      yield from lookup__c._iter_paths__(sub)
 
 class lookup_wrapper__c(object):
   __slots__ = ("m_root", "m_prefix",)
@@ -209,7 +276,7 @@ class interval__c(tuple):
     else: raise _interval_error_((v_min, v_max))
 
   def contains(self, value):
-    return ((self[0] <= value) and (value < self[1]))
+    return _interval_contains__(self[0], self[1], value)
   def __str__(self):
     if(self[0] == float_inf_minus): return f"]{self[0]}, {self[1]}["
     else: return f"[{self[0]}, {self[1]}["
@@ -253,7 +320,7 @@ def _extend_dlist_interval_(dlist, v):
         return [*dlist[:idx_min], interval__c(v_min, v_max), *dlist[idx_max:]]
 
 class domain__c(tuple):
-  __slots__ = ()
+  # no __slots__ here: the instance dict stores the flattened bounds computed on first contains()
   def __new__(cls, *args):
     if((len(args) == 2) and (is_valid_bound_ext(args[0])) and (is_valid_bound_ext(args[1]))):
       args = (interval__c(args[0], args[1]),)
@@ -265,9 +332,28 @@ class domain__c(tuple):
     return tuple.__new__(domain__c, res)
   def contains(self, value):
     if(bool(self)):
-      idx = bisect.bisect(self, value, key=interval_min)
-      return (0 < idx) and (value < self[idx-1][1])
+      bounds = getattr(self, "m_bounds", None)
+      if(bounds is None):
+        bounds = (tuple(float(itv[0]) for itv in self), tuple(float(itv[1]) for itv in self))
+        self.m_bounds = bounds
+      return _domain_contains__(bounds[0], bounds[1], value)
     else: return True
+  def check_array(self, values):
+    """check_array(sequence[number]) -> numpy.ndarray[bool]
+Vectorized version of the `contains` method: returns the membership mask of all the values in parameter.
+Falls back to one `contains` call per value when numpy is not available (in which case a list is returned).
+    """
+    if(numpy is None):
+      return [self.contains(value) for value in values]
+    values = numpy.asarray(values)
+    if(bool(self)):
+      arrays = getattr(self, "m_arrays", None)
+      if(arrays is None):
+        arrays = (numpy.array([itv[0] for itv in self], dtype=float), numpy.array([itv[1] for itv in self], dtype=float))
+        self.m_arrays = arrays
+      return ((values[:, None] >= arrays[0]) & (values[:, None] < arrays[1])).any(axis=1)
+    else:
+      return numpy.ones(len(values), dtype=bool)
   def __str__(self):
     if(bool(self)):
       return " ∪ ".join(map(str, self))
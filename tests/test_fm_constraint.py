@@ -102,6 +102,7 @@ def test_constraint():
   for i, (c, prod, expected) in enumerate(test):
     res = c(prod, expected=expected)
     assert(bool(res) == expected)
+    assert(c.compile()(prod) == expected)
     # if(bool(res) != expected):
     #   print(f"== ERROR IN TEST {i}")
     #   print(f" res: {bool(res)}")
@@ -110,6 +111,38 @@ def test_constraint():
     #   print(f" reason: {res.m_reason}")
 
 
+def test_constraint_explain():
+  print("==========================================")
+  print("= test_constraint_explain")
+
+  from pydop import fm_result
+
+  c = Lt("val_1", "val_2")
+  prod = {"val_1": 0, "val_2": 0}
+
+  prev = fm_result._set_collect_reasons__(False)
+  try:
+    res = c(prod)
+    assert(bool(res) is False)
+    assert(res.m_reason is None)
+  finally:
+    fm_result._set_collect_reasons__(prev)
+
+  res = c.explain(prod)
+  assert(bool(res) is False)
+  assert(res.m_reason is not None)
+
+
+def test_constraint_var_flyweight():
+  print("==========================================")
+  print("= test_constraint_var_flyweight")
+
+  c1 = And("val_1", "val_2")
+  c2 = Or("val_1", "val_3")
+  assert(c1.m_content[0] is c2.m_content[0])
+  assert(c1.m_content[1] is not c2.m_content[1])
+
+
 def test_constraint_dimacs():
   print("==========================================")
   print("= test_constraint_dimacs")
@@ -144,4 +177,6 @@ def test_constraint_dimacs():
 
 if(__name__ == "__main__"):
   test_constraint()
+  test_constraint_explain()
+  test_constraint_var_flyweight()
   # test_constraint_dimacs()
@@ -641,10 +641,104 @@ def test_fm_full():
 
 
 
+def test_fm_evaluate_batch():
+  print("==========================================")
+  print("= test_fm_evaluate_batch")
+
+  fm_01 = FD('A',
+    FDAnd('B', FDXor(FD('B0'), FD('B1')), FDXor(FD('B2'), FD('B3'))),
+    FDAny('C', FD('C0'), FD('C1')),
+    FDOr('D', FD('D0'), FD('D1')),
+    FDXor('E', FD('E0'), FD('E1')),
+    Implies(And('B/B0', 'C/C0'), Not('E1')),
+    F=List(size=(1,4), spec=Int(3,5))
+  )
+
+  conf_base = {
+    'A' : True,
+    'B' : True, 'B0': True, 'B1': False, 'B2': True, 'B3': False,
+    'C' : True, 'C0': False, 'C1': False,
+    'D' : True, 'D0': True, 'D1': False,
+    'E' : True, 'E0': True, 'E1': False,
+    'F':  (3,),
+  }
+
+  def update(**kwargs):
+    return dict([(k, v) for d in (conf_base, kwargs) for k,v in d.items()])
+
+  confs_raw = (
+    conf_base,
+    update(B0=False, B1=True),
+    update(B0=True, B1=True),
+    update(C0=True, C1=True),
+    update(D0=False),
+    update(E0=True, E1=True),
+    update(F=(3,4,5)),
+    update(C0=True, E1=True),
+  )
+
+  errors = fm_01.generate_lookup()
+  assert(not bool(errors))
+
+  confs = []
+  for conf_raw in confs_raw:
+    conf, error = fm_01.close_configuration(conf_raw)
+    assert(not bool(error))
+    confs.append(conf)
+
+  expected = [bool(fm_01(conf)) for conf in confs]
+  assert(fm_01.evaluate_batch(confs) == expected)
+
+
+def test_attribute_check_array():
+  print("==========================================")
+  print("= test_attribute_check_array")
+
+  att_05 = Int((1, 5), (9,None))
+  att_06 = Float((None, 5), (9,10))
+
+  values_05 = (0, 1, 4, 5, 8, 9, 24,)
+  values_06 = (-100.0, 4.0, 5.0, 8.0, 9.0, 10.0,)
+
+  res_05 = att_05.check_array(values_05)
+  res_06 = att_06.check_array(values_06)
+  assert(tuple(bool(v) for v in res_05) == (False, True, True, False, False, True, True,))
+  assert(tuple(bool(v) for v in res_06) == (True, True, False, False, True, False,))
+
+
+def test_fm_clean_regenerate():
+  print("==========================================")
+  print("= test_fm_clean_regenerate")
+
+  fm = FD('A', FD('B'))
+  errors = fm.generate_lookup()
+  assert(not errors)
+  lookup = fm.m_lookup
+
+  # clean without a structure change: the generated lookup is reused
+  fm.clean()
+  errors = fm.generate_lookup()
+  assert(not errors)
+  assert(fm.m_lookup is lookup)
+
+  # mutate then clean: the stale lookup must not be restored
+  fm.children = fm.children + (FD('C'),)
+  fm.clean()
+  errors = fm.generate_lookup()
+  assert(not errors)
+  assert(fm.m_lookup is not lookup)
+  assert(sorted(str(p) for p in fm.m_dom.values()) == ['/A', '/A/B', '/A/C'])
+  conf, errors = fm.close_configuration({'A': True, 'C': True})
+  assert(not errors)
+
+
 if(__name__ == "__main__"):
   test_simple_attribute()
+  test_attribute_check_array()
   test_fm_values()
+  test_fm_evaluate_batch()
   test_fm_path()
   test_fm_make_product()
   test_fm_constraint()
   test_fm_full()
+  test_fm_clean_regenerate()